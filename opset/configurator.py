@@ -1,21 +1,21 @@
+import hashlib
 import inspect
 import logging
-import operator
 import os
+import pickle
 import socket
 import sys
+import tempfile
 import typing
 import warnings
+from collections import OrderedDict
 from contextlib import contextmanager
-from copy import deepcopy
-from functools import reduce
+from functools import lru_cache
+from importlib import resources
 from typing import Any, Generic, TypeVar
 
-import pkg_resources
-import structlog
 import yaml
-from munch import munchify
-from pydantic import BaseModel, model_validator
+from pydantic import BaseModel, ValidationInfo, model_validator
 from pydantic.fields import FieldInfo
 from pydantic_core import PydanticUndefined
 
@@ -24,23 +24,30 @@ from opset.gcp_secret_handler import (
     OPSET_GCP_PREFIX,
     MissingGcpSecretManagerLibrary,
     is_gcp_available,
-    retrieve_gcp_secret_value,
+    retrieve_gcp_secret_values,
 )
 
 OPSET_CONFIG_FILENAME = ".opset.yml"
 OPSET_UNIT_TEST_FLAG = "UNIT_TEST_FLAG"
 OPSET_SKIP_VALIDATION_FLAG = "OPSET_SKIP_VALIDATION"
+OPSET_YAML_CACHE_DIR = "OPSET_YAML_CACHE_DIR"
 OpsetSettingsMainModelType = TypeVar("OpsetSettingsMainModelType", bound="OpsetSettingsMainModel")
 
+try:
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader as _YAMLLoader  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
-_opset_config: dict[str, Any] = {}
+_YAML_CACHE_MAX_SIZE = 100
+_yaml_cache: OrderedDict[str, tuple[int, int, dict]] = OrderedDict()
 
 
 class OpsetSettingsBaseModel(BaseModel):
     @model_validator(mode="before")
     @classmethod
-    def parse_values(cls, values: dict[str, Any]) -> dict[str, Any]:
+    def parse_values(cls, values: dict[str, Any], info: ValidationInfo) -> dict[str, Any]:
         unprocessed_gcp_secret_keys = []
         for k, field_info in cls.model_fields.items():
             if v := values.get(k):
@@ -56,13 +63,18 @@ class OpsetSettingsBaseModel(BaseModel):
                     if (default := field_info.get_default()) and default != PydanticUndefined:
                         values[k] = default
                     else:
-                        values[k] = field_type()
+                        # Forward the context so secrets in the nested defaults still get the project mapping
+                        values[k] = field_type.model_validate({}, context=info.context)
 
-        if not is_gcp_available() and unprocessed_gcp_secret_keys:
+        if unprocessed_gcp_secret_keys and not is_gcp_available():
             raise MissingGcpSecretManagerLibrary()
 
-        for k in unprocessed_gcp_secret_keys:
-            values[k] = utils.convert_type(retrieve_gcp_secret_value(values[k], _opset_config))
+        if unprocessed_gcp_secret_keys:
+            # All the secrets of the model are fetched in a single batch
+            opset_config = (info.context or {}).get("opset_config")
+            secret_values = retrieve_gcp_secret_values([values[k] for k in unprocessed_gcp_secret_keys], opset_config)
+            for k in unprocessed_gcp_secret_keys:
+                values[k] = utils.convert_type(secret_values[values[k]])
 
         return values
 
@@ -71,7 +83,10 @@ class OpsetSettingsMainModel(OpsetSettingsBaseModel):
     _opset: "Config"
 
     def __init__(self, _opset: "Config", **data: dict[str, Any]) -> None:
-        super().__init__(**data)
+        # The opset config is passed down to the validators through the context instead of a module global
+        self.__pydantic_validator__.validate_python(
+            data, self_instance=self, context={"opset_config": getattr(_opset, "_opset_config", None)}
+        )
         self._opset = _opset
 
     @property
@@ -93,15 +108,36 @@ class OpsetLoggingConfig(OpsetSettingsBaseModel):
 class BackwardConfig:
     def __init__(self) -> None:
         self._config: dict[str, Any] = {}
+        self._pending_config: dict[str, Any] | None = None
+        self._sections: list[str] = []
 
     def __getattr__(self, item: str) -> Any:
+        # The snapshot is only converted to a Munch on first access, the config is often set multiple times in a row
+        # (e.g. mock_config, setup_unit_test) without the backward config ever being read.
+        if self._pending_config is not None:
+            from munch import munchify
+
+            self._config = munchify(self._pending_config)
+            self._pending_config = None
+
+            # Sections are exposed as instance attributes so that later reads don't go through __getattr__ at all
+            self._sections = [k for k in self._config if not k.startswith("_") and not hasattr(type(self), k)]
+            self.__dict__.update({k: self._config[k] for k in self._sections})
+
+            if item in self._sections:
+                return self.__dict__[item]
+
         try:
             return getattr(self._config, item)
         except AttributeError:
             raise AttributeError(f"Section [{item}] not found in the config.")
 
     def set_config(self, new_config: OpsetSettingsMainModelType) -> None:
-        self._config = munchify(new_config.model_dump())
+        for section in self._sections:
+            self.__dict__.pop(section, None)
+        self._sections = []
+        # Snapshot the values now, later in-place edits of the model must not show up in the backward config
+        self._pending_config = new_config.model_dump()
 
 
 config = BackwardConfig()
@@ -121,6 +157,7 @@ def _in_test() -> bool:
 
 class Config(Generic[OpsetSettingsMainModelType]):
     _config: OpsetSettingsMainModelType | None = None
+    _env_vars_overrides_cache: dict[tuple[type, str], dict[str, list[list[str]]]] = {}
 
     def __init__(
         self,
@@ -134,14 +171,15 @@ class Config(Generic[OpsetSettingsMainModelType]):
             raise OpsetConfigAlreadyInitializedError("Config already initialized")
 
         self.app_name = app_name
+        self._formatted_name = app_name.upper().replace("-", "_") if app_name else ""
         self.config_path = config_path
         self.setup_logging = setup_logging
         self.config_model = config_model
+        self._config_file_paths: dict[str, str] = {}
 
         logger.info(f"Initializing config for {self.app_name}")
 
-        global _opset_config
-        _opset_config = init_opset_config(self.config_path)
+        self._opset_config = init_opset_config(self.config_path)
 
         raw_model: OpsetSettingsMainModelType = config_model.model_construct(_opset=self)
 
@@ -157,7 +195,7 @@ class Config(Generic[OpsetSettingsMainModelType]):
             )
 
             if config_overrides:
-                declared_config = self._merge_configs(deepcopy(declared_config), config_overrides)
+                declared_config = self._merge_configs(declared_config, config_overrides)
 
             should_validate = os.getenv(OPSET_SKIP_VALIDATION_FLAG) is None
 
@@ -188,7 +226,7 @@ class Config(Generic[OpsetSettingsMainModelType]):
 
         Returns: A representation of the application name fit for fetching environment variables.
         """
-        return self.app_name.upper().replace("-", "_") if self.app_name else ""
+        return self._formatted_name
 
     @classmethod
     def __set_class_config(cls, internal_config: OpsetSettingsMainModelType) -> None:
@@ -211,7 +249,9 @@ class Config(Generic[OpsetSettingsMainModelType]):
 
     @contextmanager
     def mock_config(self, config_values: dict[str, Any]) -> typing.Generator:
-        old_config = deepcopy(self.config)
+        # Fields are replaced rather than mutated below, a shallow snapshot of them is enough to restore the config
+        # exactly, without a deepcopy or validating the values again
+        old_config_values = {f: getattr(self.config, f) for f in type(self.config).model_fields}
         declared_config = self._merge_configs(self.config.model_dump(), config_values)
 
         # We update the existing object to not lose any object referenced before mock_config was called
@@ -219,9 +259,12 @@ class Config(Generic[OpsetSettingsMainModelType]):
         self._update_pydantic_model_in_place(self.config, new_config)
 
         self.__set_global_config()
-        yield
-        self._update_pydantic_model_in_place(self.config, old_config)
-        self.__set_global_config()
+        try:
+            yield
+        finally:
+            for f, value in old_config_values.items():
+                setattr(self.config, f, value)
+            self.__set_global_config()
 
     def setup_unit_test(self, config_values: dict[str, Any]) -> None:
         declared_config = self._merge_configs(self.config.model_dump(), config_values)
@@ -233,58 +276,58 @@ class Config(Generic[OpsetSettingsMainModelType]):
         self.__set_global_config()
 
     def _get_config_file_path(self, config_name: str) -> str:
-        tentative_path = pkg_resources.resource_filename(self.config_path, config_name)
+        if (cached_path := self._config_file_paths.get(config_name)) is not None:
+            return cached_path
+
+        tentative_path = str(_resource_files(self.config_path) / config_name)
 
         if not os.path.exists(tentative_path):
             try:
                 split_path = self.config_path.rsplit(".", maxsplit=1)
-                tentative_path = pkg_resources.resource_filename(split_path[0], f"{split_path[1]}/{config_name}")
+                tentative_path = str(_resource_files(split_path[0]) / split_path[1] / config_name)
             except Exception:
                 pass
 
+        self._config_file_paths[config_name] = tentative_path
         return tentative_path
 
     def _read_yaml_config(self, config_name: str, raise_not_found: bool = True) -> dict[str, dict]:
         config_path = self._get_config_file_path(config_name)
         try:
-            with open(config_path, "r") as config_file:
-                return yaml.load(config_file, Loader=yaml.FullLoader) or {}
+            return _load_yaml_file(config_path)
         except FileNotFoundError:
-            warnings.warn(f"WARNING: Config not found at {config_path}")
+            # A missing optional config (e.g. local.yml) is expected, don't bother warning about it
             if raise_not_found:
+                warnings.warn(f"WARNING: Config not found at {config_path}")
                 raise
             return {}
 
-    def _merge_configs(self, base_config: dict, override_config: dict, current_path: list[str] | None = None) -> dict:
-        """Recursively traverse two configs and apply values from the `override_config` onto the `base_config`.
+    def _merge_configs(self, base_config: dict, override_config: dict) -> dict:
+        """Traverse two configs and apply values from the `override_config` onto the `base_config`.
 
-        This method will also warn the user about keys present in the override dict that are
-        not present in the base one, these keys will be ignored.
+        Nested dictionaries are merged iteratively with an explicit stack rather than through recursion.
 
         Args:
             base_config: Base config, this object will be modified directly. If you wish to keep
                          your original object for later it is recommended to pass a deepcopy of it instead.
             override_config: Override config, keys matching the base config will be applied to it.
-            current_path: List of keys traversed to reach the current position in the dictionaries.
 
         Returns:
             The resulting merged dictionary built from the other two.
         """
-        if current_path is None:
-            current_path = []
-
-        for key, override_value in override_config.items():
-            next_path = current_path + [key]
-
-            if key in base_config:
+        stack = [(base_config, override_config)]
+        while stack:
+            base, override = stack.pop()
+            for key, override_value in override.items():
                 if isinstance(override_value, dict):
-                    if base_config[key] is None:
-                        base_config[key] = {}
-                    base_config[key] = self._merge_configs(base_config[key], override_value, next_path)
-                else:
-                    base_config[key] = override_value
-            else:
-                base_config[key] = override_value
+                    base_value = base.get(key)
+                    if isinstance(base_value, dict):
+                        if override_value:
+                            stack.append((base_value, override_value))
+                        continue
+                    # The validators rewrite the merged values in place, the caller's dict must not end up in there
+                    override_value = _fast_clone(override_value)
+                base[key] = override_value
         return base_config
 
     @staticmethod
@@ -309,7 +352,9 @@ class Config(Generic[OpsetSettingsMainModelType]):
         Returns:
             The last element in the dictionary from the path provided, can be a value or a sub-dictionary
         """
-        return reduce(operator.getitem, path, config_dict)
+        for key in path:
+            config_dict = config_dict[key]
+        return config_dict
 
     def _get_possible_env_var_overrides(
         self,
@@ -320,6 +365,8 @@ class Config(Generic[OpsetSettingsMainModelType]):
     ) -> list[tuple[str, list[str]]]:
         """From a base config, determine the possible environment variables that can be used to override values.
 
+        Nested settings models are walked iteratively with an explicit stack rather than through recursion.
+
         Args:
             fields: mapping of all fields and their field info from Pydantic.
             current_path: List of strings representing the path to the value in the config.
@@ -329,23 +376,16 @@ class Config(Generic[OpsetSettingsMainModelType]):
             A list of tuples representing the environment variable name and path in the config
             of each possible override.
         """
-
-        if current_path is None:
-            current_path = []
-
         keys = []
-        for key, field_info in fields.items():
-            field_type = typing.get_origin(field_info.annotation) or field_info.annotation
-            if inspect.isclass(field_type) and issubclass(field_type, OpsetSettingsBaseModel):
-                keys.extend(
-                    self._get_possible_env_var_overrides(
-                        field_type.model_fields, current_path=current_path + [key], prefix=prefix
-                    )
-                )
-            else:
-                path_key = current_path + [key]
-                path_key = [prefix] + path_key
-                keys.append(("_".join(path_key).upper(), current_path + [key]))
+        stack = [(fields, current_path or [])]
+        while stack:
+            current_fields, path = stack.pop()
+            for key, field_info in current_fields.items():
+                field_type = typing.get_origin(field_info.annotation) or field_info.annotation
+                if inspect.isclass(field_type) and issubclass(field_type, OpsetSettingsBaseModel):
+                    stack.append((field_type.model_fields, path + [key]))
+                else:
+                    keys.append(("_".join([prefix, *path, key]).upper(), path + [key]))
 
         return keys
 
@@ -355,27 +395,52 @@ class Config(Generic[OpsetSettingsMainModelType]):
         Args:
             current_config: The config that should be overridden with values from environment variables.
         """
-        env_vars_overrides = self._get_possible_env_var_overrides(model_fields, prefix=self.__formatted_name)
-        possible_names = []
-        for env_var_name, env_var_path in env_vars_overrides:
-            if env_var_name in os.environ:
-                possible_names.append(env_var_name)
-
-                if len(env_var_path) == 1:
-                    current_config[env_var_path[0]] = os.environ[env_var_name]
-                else:
-                    cur_dict = current_config
-                    for path in env_var_path[:-1]:
-                        if not cur_dict.get(path):
-                            cur_dict[path] = {}
-
-                        cur_dict = cur_dict[path]
-
-                    cur_dict[env_var_path[-1]] = os.environ[env_var_name]
-
-        for env_key in os.environ.keys():
-            if env_key.startswith(f"{self.__formatted_name}_") and env_key not in possible_names:
-                warnings.warn(f"Environment variable [{env_key}] does not match any possible setting, ignoring.")
+        # Every env var of the system goes through this check, keep the prefix and `startswith` bound locally
+        prefix = f"{self.__formatted_name}_"
+        startswith = str.startswith
+        app_env_vars = {k: v for k, v in os.environ.items() if startswith(k, prefix)}
+        if not app_env_vars:
+            # Common case, nothing to override and no need to build the table of possible overrides
+            return
+
+        # The possible overrides only depend on the model and the app name, they are computed once per combination
+        cache_key = (self.config_model, self.__formatted_name)
+        env_vars_overrides = self._env_vars_overrides_cache.get(cache_key)
+        if env_vars_overrides is None:
+            # Different settings can map to the same env var (e.g. `app_timeout` and `app.timeout`), keep every path
+            env_vars_overrides = {}
+            for env_var_name, env_var_path in self._get_possible_env_var_overrides(
+                model_fields, prefix=self.__formatted_name
+            ):
+                env_vars_overrides.setdefault(env_var_name, []).append(env_var_path)
+            self._env_vars_overrides_cache[cache_key] = env_vars_overrides
+
+        # Unknown variables are reported in a single warning, `warnings.warn` is costly to call repeatedly
+        unknown_env_vars = []
+        for env_var_name, env_var_value in app_env_vars.items():
+            env_var_paths = env_vars_overrides.get(env_var_name)
+            if env_var_paths is None:
+                unknown_env_vars.append(env_var_name)
+                continue
+
+            for env_var_path in env_var_paths:
+                cur_dict = current_config
+                for path in env_var_path[:-1]:
+                    next_dict = cur_dict.get(path)
+                    if not isinstance(next_dict, dict):
+                        # Nested sections left unset (None) are created on the fly
+                        next_dict = cur_dict[path] = {}
+                    cur_dict = next_dict
+
+                cur_dict[env_var_path[-1]] = env_var_value
+
+        if len(unknown_env_vars) == 1:
+            warnings.warn(
+                f"Environment variable [{unknown_env_vars[0]}] does not match any possible setting, ignoring."
+            )
+        elif unknown_env_vars:
+            formatted_names = ", ".join(f"[{name}]" for name in unknown_env_vars)
+            warnings.warn(f"Environment variables {formatted_names} do not match any possible setting, ignoring.")
 
 
 def init_opset_config(config_path: str) -> dict[str, Any]:
@@ -387,33 +452,181 @@ def init_opset_config(config_path: str) -> dict[str, Any]:
     config_filepath = _search_for_config_file(config_path)
 
     if config_filepath:
-        with open(config_filepath, "r") as config_file:
-            return yaml.load(config_file, Loader=yaml.FullLoader) or {}
+        return _load_yaml_file(config_filepath)
 
     return {}
 
 
+def _resource_files(package: str) -> Any:
+    """Locate the files of a package, config lookups go through here so `mock_config_file` only stubs opset's own."""
+    return resources.files(package)
+
+
 def _search_for_config_file(dir_path: str) -> str | None:
-    if os.path.exists(os.path.join(dir_path, OPSET_CONFIG_FILENAME)):
-        return os.path.join(dir_path, OPSET_CONFIG_FILENAME)
-    else:
-        if dir_path == "/":
+    dir_path = os.path.abspath(dir_path)
+    while True:
+        candidate = os.path.join(dir_path, OPSET_CONFIG_FILENAME)
+        if os.path.exists(candidate):
+            return candidate
+
+        parent_dir = os.path.dirname(dir_path)
+        if parent_dir == dir_path:
             return None
-        parent_dir = os.path.abspath(os.path.join(dir_path, os.pardir))
-        return _search_for_config_file(parent_dir)
+        dir_path = parent_dir
+
+
+def _fast_clone(value: Any) -> Any:
+    """Copy a JSON-like tree made of dicts, lists and immutable leaves.
+
+    Much cheaper than `copy.deepcopy` for parsed config files since there is no memo bookkeeping or `__reduce_ex__`
+    dispatch. Any value that is not a dict or a list is returned as is.
+    """
+    value_type = type(value)
+    if value_type is dict:
+        return {k: _fast_clone(v) for k, v in value.items()}
+    if value_type is list:
+        return [_fast_clone(v) for v in value]
+    return value
+
+
+def _load_yaml_file(file_path: str) -> dict:
+    """Load a YAML file, reusing the previously parsed content if the file did not change since.
+
+    Parsed files are cached by path and invalidated when their modification time or size changes. A copy of the
+    cached content is returned since callers are free to modify it.
+
+    Args:
+        file_path: Path of the YAML file to load.
+
+    Returns:
+        The content of the YAML file or an empty dict if the file is empty.
+    """
+    stat = os.stat(file_path)
+
+    cached = _yaml_cache.get(file_path)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        _yaml_cache.move_to_end(file_path)
+        return typing.cast(dict, _fast_clone(cached[2]))
+
+    content = _read_yaml_file(file_path, stat)
+
+    _yaml_cache[file_path] = (stat.st_mtime_ns, stat.st_size, content)
+    _yaml_cache.move_to_end(file_path)
+    if len(_yaml_cache) > _YAML_CACHE_MAX_SIZE:
+        _yaml_cache.popitem(last=False)
+
+    return typing.cast(dict, _fast_clone(content))
+
+
+def _read_yaml_file(file_path: str, stat: os.stat_result) -> dict:
+    """Parse a YAML file, going through the on-disk cache when `OPSET_YAML_CACHE_DIR` is set.
+
+    The on-disk cache is opt-in since config files such as `local.yml` may contain secrets. Each file is pickled in the
+    cache directory along with the modification time and size it was parsed from, a stale entry is simply re-parsed.
+    Unpickling runs code, the cache directory is ignored unless it is private to the current user.
+
+    Args:
+        file_path: Path of the YAML file to parse.
+        stat: Result of `os.stat` on the YAML file.
+
+    Returns:
+        The content of the YAML file or an empty dict if the file is empty.
+    """
+    cache_dir = os.getenv(OPSET_YAML_CACHE_DIR)
+    cache_path = None
+    if cache_dir and not utils.ensure_private_dir(cache_dir):
+        logger.warning(
+            f"Ignoring {OPSET_YAML_CACHE_DIR}, {cache_dir} must be a directory owned by the current user and not "
+            "writable by others."
+        )
+    elif cache_dir:
+        cache_name = hashlib.sha256(os.path.abspath(file_path).encode()).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{cache_name}.pkl")
+        try:
+            with open(cache_path, "rb") as cache_file:
+                mtime_ns, size, content = pickle.load(cache_file)
+            if mtime_ns == stat.st_mtime_ns and size == stat.st_size:
+                return typing.cast(dict, content)
+        except Exception:
+            pass
+
+    with open(file_path, "rb") as config_file:
+        content = yaml.load(config_file, Loader=_YAMLLoader) or {}
+
+    if cache_path:
+        try:
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(cache_path), delete=False) as tmp_cache_file:
+                pickle.dump((stat.st_mtime_ns, stat.st_size, content), tmp_cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_cache_file.name, cache_path)
+        except OSError:
+            logger.debug(f"Could not write YAML cache for {file_path} to {cache_path}")
+
+    return typing.cast(dict, content)
 
 
 class BaseProcessor(object):
+    __slots__ = ()
+
     def __call__(self, logger: logging.Logger, name: str, event_dict: dict) -> dict:
         return event_dict
 
 
 class HostNameProcessor(BaseProcessor):
+    __slots__ = ("_hostname",)
+
+    def __init__(self) -> None:
+        # The hostname won't change during the lifetime of the process, no need for a syscall on every log record
+        self._hostname = socket.gethostname()
+
     def __call__(self, logger: logging.Logger, name: str, event_dict: dict) -> dict:
-        event_dict["hostname"] = socket.gethostname()
+        event_dict["hostname"] = self._hostname
         return event_dict
 
 
+@lru_cache(maxsize=1)
+def _get_hostname_processor() -> HostNameProcessor:
+    return HostNameProcessor()
+
+
+@lru_cache(maxsize=8)
+def _get_builtin_processors(date_format: str, use_utc: bool) -> tuple[Any, ...]:
+    """Build the structlog processors shared by every log record, these are stateless and can be reused across calls."""
+    import structlog
+
+    return (
+        structlog.stdlib.add_log_level,
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+        structlog.processors.TimeStamper(fmt=date_format, utc=use_utc),
+        structlog.processors.UnicodeDecoder(),
+        structlog.stdlib.add_logger_name,
+    )
+
+
+@lru_cache(maxsize=4)
+def _get_json_formatter_processors(json_event_key: str) -> tuple[Any, ...]:
+    """Build the processors rendering log records as JSON, like the builtin processors they are stateless."""
+    import structlog
+
+    return (
+        structlog.processors.EventRenamer(json_event_key),
+        structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+        structlog.processors.JSONRenderer(),
+    )
+
+
+@lru_cache(maxsize=4)
+def _get_level_styles(use_colors: bool) -> dict[str, str]:
+    import structlog
+
+    level_styles = structlog.dev.ConsoleRenderer.get_default_level_styles(colors=use_colors)
+
+    if use_colors:
+        level_styles["debug"] = "[34m"  # blue
+
+    return level_styles
+
+
 def load_logging_config(
     logging_config: OpsetLoggingConfig,
     custom_processors: list[BaseProcessor] | None = None,
@@ -431,30 +644,26 @@ def load_logging_config(
     Returns:
         A list of handlers depending on the config if argument return_handlers has been set to True.
     """
+    # structlog is only needed once logging is set up, don't pay for its import otherwise
+    import structlog
+
     if logging_config.disable_processors:
         custom_processors = []
     else:
-        custom_processors = custom_processors or []
+        custom_processors = list(custom_processors or [])
         if use_hostname_processor:
-            custom_processors.append(HostNameProcessor())
+            custom_processors.append(_get_hostname_processor())
 
-    pre_processors = [
-        structlog.stdlib.filter_by_level,
-    ]
     shared_processors: Any = [
-        structlog.stdlib.add_log_level,
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.TimeStamper(fmt=logging_config.date_format, utc=logging_config.use_utc),
-        structlog.processors.UnicodeDecoder(),
-        structlog.stdlib.add_logger_name,
-    ] + custom_processors
-    post_processors = [
+        *_get_builtin_processors(logging_config.date_format, logging_config.use_utc),
+        *custom_processors,
+    ]
+    processors: Any = [
+        structlog.stdlib.filter_by_level,
+        *shared_processors,
         structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
     ]
 
-    processors: Any = pre_processors + shared_processors + post_processors
-
     structlog.reset_defaults()
     structlog.configure(
         processors=processors,
@@ -463,18 +672,11 @@ def load_logging_config(
         wrapper_class=structlog.stdlib.BoundLogger,
     )
 
-    default_level_styles = structlog.dev.ConsoleRenderer.get_default_level_styles(colors=logging_config.use_colors)
-
-    if logging_config.use_colors:
-        default_level_styles["debug"] = "[34m"  # blue
+    default_level_styles = dict(_get_level_styles(logging_config.use_colors))
 
     if logging_config.json_format:
         formatter = structlog.stdlib.ProcessorFormatter(
-            processors=[
-                structlog.processors.EventRenamer(logging_config.json_event_key),
-                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
-                structlog.processors.JSONRenderer(),
-            ],
+            processors=list(_get_json_formatter_processors(logging_config.json_event_key)),
             foreign_pre_chain=shared_processors,
         )
     else:
@@ -1,19 +1,23 @@
+import hashlib
 import json
 import logging
-import re
-from typing import Any, cast
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+from typing import TYPE_CHECKING, Any, cast
 
 from opset import utils
 
-try:
+if TYPE_CHECKING:
     from google.cloud import secretmanager
-except ImportError:
-    secretmanager = None  # type: ignore
-    _has_secretmanager = False
-else:
-    _has_secretmanager = True
 
 OPSET_GCP_PREFIX = "opset+gcp://"
+MAX_CONCURRENT_SECRET_FETCHES = 8
+SECRET_VALUES_CACHE_SIZE = 256
+OPSET_SECRET_CACHE_DIR = "OPSET_SECRET_CACHE_DIR"
 
 logger = logging.getLogger(__name__)
 
@@ -57,17 +61,44 @@ class GcpError(Exception):
         super().__init__(f"Got error from google cloud secret manager API for secret `{secret_string}`.")
 
 
+@lru_cache(maxsize=1)
+def _load_secretmanager() -> Any:
+    """Import the secret manager library on first use, it pulls in grpc and protobuf which are slow to import."""
+    try:
+        from google.cloud import secretmanager
+    except ImportError:
+        return None
+
+    return secretmanager
+
+
+def __getattr__(name: str) -> Any:
+    # Keep `gcp_secret_handler.secretmanager` available now that the library is only imported on demand
+    if name == "secretmanager":
+        return _load_secretmanager()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def is_gcp_available() -> bool:
-    return _has_secretmanager
+    return _load_secretmanager() is not None
 
 
 class OpsetSecretManagerClient:
     instance: Any | None = None
+    _lock = threading.Lock()
 
     @classmethod
     def get_or_create(cls) -> Any:
-        if not cls.instance:
-            cls.instance = secretmanager.SecretManagerServiceClient()
+        # Secrets are fetched from many threads, the lock makes sure a single client (and gRPC channel) is created
+        if cls.instance is None:
+            with cls._lock:
+                if cls.instance is None:
+                    secretmanager_module = _load_secretmanager()
+                    if secretmanager_module is None:
+                        raise MissingGcpSecretManagerLibrary()
+
+                    cls.instance = secretmanager_module.SecretManagerServiceClient()
 
         return cls.instance
 
@@ -82,28 +113,123 @@ def retrieve_gcp_secret_value(secret_string: str, config: dict[str, Any] | None
     Returns:
         Value from Google cloud secret manager
     """
+    return retrieve_gcp_secret_values([secret_string], config)[secret_string]
+
+
+def retrieve_gcp_secret_values(secret_strings: list[str], config: dict[str, Any] | None = None) -> dict[str, str]:
+    """Retrieve many secret values from Google cloud secret manager at once
+
+    Every secret referenced by the secret strings is fetched concurrently, secrets referenced more than once are only
+    fetched a single time.
+
+    Args:
+        secret_strings: Unprocessed secret values that contain information for secretmanager.
+        config: Opset Gcp config that contains mapping
+
+    Returns:
+        Mapping of each unprocessed secret value to its value from Google cloud secret manager
+    """
+    secret_names_by_string: dict[str, list[str]] = {}
+    secret_string_by_name: dict[str, str] = {}
+    for secret_string in secret_strings:
+        if secret_string in secret_names_by_string:
+            continue
+
+        secret_names = _get_secret_names(secret_string, config)
+        secret_names_by_string[secret_string] = secret_names
+        for secret_name in secret_names:
+            secret_string_by_name.setdefault(secret_name, secret_string)
+
+    secret_values = _access_secret_values(secret_string_by_name)
+
+    return {
+        secret_string: _combine_secret_values([secret_values[secret_name] for secret_name in secret_names])
+        for secret_string, secret_names in secret_names_by_string.items()
+    }
+
+
+def _get_secret_names(secret_string: str, config: dict[str, Any] | None = None) -> list[str]:
     # Cleanup the string a bit to support multiline strings in YAML (e.g. '>-')
-    secret_string = secret_string.strip().replace(" ", "")
+    cleaned_secret_string = secret_string.strip().replace(" ", "")
 
-    _validate_secret_string(secret_string)
-    logger.debug(f"Fetching secret from gcp using {secret_string}")
-    parsed_secret_names = _parse_unprocessed_gcp_secrets(secret_string)
+    parsed_secret_names = _parse_unprocessed_gcp_secrets(cleaned_secret_string)
+    logger.debug(f"Fetching secret from gcp using {cleaned_secret_string}")
     versioned_secret_names = _add_version_if_needed(parsed_secret_names)
-    fully_processed_secret_names = _apply_project_mapping(versioned_secret_names, config)
+    return _apply_project_mapping(versioned_secret_names, config)
+
+
+def _access_secret_values(secret_string_by_name: dict[str, str]) -> dict[str, str]:
+    def access(secret_name: str) -> str:
+        try:
+            return _access_secret_value(secret_name)
+        except Exception as e:
+            raise GcpError(secret_string_by_name[secret_name]) from e
+
+    secret_names = list(secret_string_by_name)
+    if not secret_names:
+        return {}
+
+    if len(secret_names) == 1:
+        return {secret_names[0]: access(secret_names[0])}
+
+    # `map` keeps the values in the order of the secret names
+    max_workers = min(MAX_CONCURRENT_SECRET_FETCHES, len(secret_names))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(secret_names, executor.map(access, secret_names)))
+
+
+@lru_cache(maxsize=SECRET_VALUES_CACHE_SIZE)
+def _access_secret_value(secret_name: str) -> str:
+    """Fetch a single fully qualified secret version, values are cached for the life of the process.
+
+    Numbered versions are also cached on disk across process starts when `OPSET_SECRET_CACHE_DIR` is set. Call
+    `_access_secret_value.cache_clear()` to force the secrets to be fetched again.
+    """
+    cache_path = _get_secret_cache_path(secret_name)
+    if cache_path:
+        try:
+            with open(cache_path, encoding="UTF-8", newline="") as cache_file:
+                return cache_file.read()
+        except OSError:
+            pass
 
     client: secretmanager.SecretManagerServiceClient = OpsetSecretManagerClient.get_or_create()
+    request = _load_secretmanager().AccessSecretVersionRequest(name=secret_name)
+    gcp_secret = client.access_secret_version(request=request)
+    secret_value = gcp_secret.payload.data.decode("UTF-8")
 
-    gcp_secret_values = []
-    try:
-        for fully_processed_secret_name in fully_processed_secret_names:
-            gcp_secret = client.access_secret_version(
-                request=secretmanager.AccessSecretVersionRequest(name=fully_processed_secret_name)
-            )
-            gcp_secret_values.append(gcp_secret.payload.data.decode("UTF-8"))
-    except Exception as e:
-        raise GcpError(secret_string) from e
+    if cache_path:
+        try:
+            # Temporary files are only readable by their owner, the cache entry keeps these permissions once renamed
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="UTF-8", newline="", dir=os.path.dirname(cache_path), delete=False
+            ) as tmp_cache_file:
+                tmp_cache_file.write(secret_value)
+            os.replace(tmp_cache_file.name, cache_path)
+        except OSError:
+            logger.debug(f"Could not write secret cache for {secret_name} to {cache_path}")
+
+    return secret_value
 
-    return _combine_secret_values(gcp_secret_values)
+
+def _get_secret_cache_path(secret_name: str) -> str | None:
+    """Get the on-disk cache entry of a secret version, secrets are only cached when `OPSET_SECRET_CACHE_DIR` is set.
+
+    Only numbered versions are cached, aliases such as `latest` can point to a new version at any time.
+    """
+    cache_dir = os.getenv(OPSET_SECRET_CACHE_DIR)
+    if not cache_dir or not secret_name.rsplit("/", maxsplit=1)[-1].isdigit():
+        return None
+
+    # Cached values are returned as is, a directory others can write to could serve them planted secrets
+    if not utils.ensure_private_dir(cache_dir):
+        logger.warning(
+            f"Ignoring {OPSET_SECRET_CACHE_DIR}, {cache_dir} must be a directory owned by the current user and not "
+            "writable by others."
+        )
+        return None
+
+    return os.path.join(cache_dir, hashlib.blake2b(secret_name.encode()).hexdigest())
 
 
 def _apply_project_mapping(secret_names: list[str], config: dict[str, Any] | None = None) -> list[str]:
@@ -127,30 +253,40 @@ def _apply_project_mapping(secret_names: list[str], config: dict[str, Any] | Non
 
 
 def _parse_unprocessed_gcp_secrets(secret_string: str) -> list[str]:
-    try:
-        path = secret_string.split("//")[1]
-        return path.split(";")
-    except IndexError:
+    """Split a secret string into its secret names, validating them along the way."""
+    if not secret_string.startswith(OPSET_GCP_PREFIX):
         raise InvalidGcpSecretStringException(secret_string)
 
+    secret_names = secret_string[len(OPSET_GCP_PREFIX) :].split(";")
+    if len(secret_names) > 1 and not secret_names[-1]:
+        # A trailing separator is tolerated
+        secret_names.pop()
 
-def _validate_secret_string(secret_string: str) -> None:
-    match = re.match(r"^opset\+gcp://(projects/[^/]+?/secrets/[^/]+?(?:/versions/[^/]+?)?;?)+$", secret_string)
-
-    if not match:
+    if not all(_is_valid_secret_name(secret_name) for secret_name in secret_names):
         raise InvalidGcpSecretStringException(secret_string)
 
+    return secret_names
 
-def _add_version_if_needed(secret_names: list[str]) -> list[str]:
-    versioned_secret_names = []
-    for secret_name in secret_names:
-        match = re.match(r"^projects/[^/]+?/secrets/[^/]+?(?P<version>/versions/[^/]+?)?$", secret_name)
-        if match and not match.groupdict().get("version"):
-            versioned_secret_names.append(f"{secret_name}/versions/latest")
-        else:
-            versioned_secret_names.append(secret_name)
 
-    return versioned_secret_names
+def _is_valid_secret_name(secret_name: str) -> bool:
+    """Check that a secret name is in the `projects/*/secrets/*` or `projects/*/secrets/*/versions/*` format."""
+    tokens = secret_name.split("/")
+    token_count = len(tokens)
+
+    return (
+        (token_count == 4 or (token_count == 6 and tokens[4] == "versions"))
+        and tokens[0] == "projects"
+        and tokens[2] == "secrets"
+        and all(tokens)
+    )
+
+
+def _add_version_if_needed(secret_names: list[str]) -> list[str]:
+    # Names are validated beforehand, `projects/*/secrets/*` has 3 separators where a versioned name has 5.
+    # Counting them rather than looking for `/versions/` keeps projects or secrets named "versions" working.
+    return [
+        f"{secret_name}/versions/latest" if secret_name.count("/") == 3 else secret_name for secret_name in secret_names
+    ]
 
 
 def _combine_secret_values(secret_values: list[str]) -> str:
@@ -181,10 +317,15 @@ def _combine_secret_values(secret_values: list[str]) -> str:
     if all(isinstance(value, type(converted_values[0])) for value in converted_values):
         if isinstance(converted_values[0], dict):
             dict_vals = cast(list[dict[str, Any]], converted_values)
-            combined_vals = {key: value for d in dict_vals for key, value in d.items()}
+            # Merged with `dict.update` so the copying happens in C rather than item by item
+            merged_dict: dict[str, Any] = {}
+            for d in dict_vals:
+                merged_dict.update(d)
+            combined_vals = merged_dict
         elif isinstance(converted_values[0], list):
             list_vals = cast(list[Any], converted_values)
-            combined_vals = [value for v in list_vals for value in v]
+            # Concatenated with `chain` for the same reason
+            combined_vals = list(chain.from_iterable(list_vals))
         else:
             raise UnsupportedGcpValueTypesError()
     else:
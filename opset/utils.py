@@ -2,23 +2,44 @@
 # Emilio Assuncao, 2019-01-24
 # Copyright (c) Element AI Inc. All rights not expressly granted hereunder are reserved.
 import json
+import os
+import stat
 from contextlib import contextmanager
-from tempfile import NamedTemporaryFile, _TemporaryFileWrapper  # noqa
 from typing import Any, Dict, Generator, Optional, cast
-from unittest.mock import patch
 
-import pkg_resources
-import yaml
+_IN_MEMORY_CONFIG_PREFIX = "::memory::"
 
 
-def convert_type(value: str) -> str | bool | dict | list:
-    if value.lower() in ["y", "yes", "t", "true"]:
-        return True
+class _FakeTraversable:
+    """Stand-in for the `Traversable` of a config package, resolves names from a dict."""
+
+    __slots__ = ("_configs",)
+
+    def __init__(self, configs: Dict[str, str]) -> None:
+        self._configs = configs
+
+    def __truediv__(self, resource: str) -> str:
+        return self._configs.get(resource, "")
 
-    if value.lower() in ["n", "no", "f", "false"]:
-        return False
 
-    if isinstance(value, str) and (value.startswith("{") or value.startswith("[")):
+_BOOL_VALUES = {
+    "y": True,
+    "yes": True,
+    "t": True,
+    "true": True,
+    "n": False,
+    "no": False,
+    "f": False,
+    "false": False,
+}
+
+
+def convert_type(value: str) -> str | bool | dict | list:
+    bool_value = _BOOL_VALUES.get(value.lower())
+    if bool_value is not None:
+        return bool_value
+
+    if value[:1] in ("{", "["):
         try:
             return cast(dict | list, json.loads(value))
         except json.JSONDecodeError:
@@ -27,54 +48,77 @@ def convert_type(value: str) -> str | bool | dict | list:
     return value
 
 
+def ensure_private_dir(dir_path: str) -> bool:
+    """Create a directory only accessible to the current user, or check that an existing one is as private.
+
+    Files read back from an on-disk cache are trusted, a directory anyone else can write to could be used to plant them.
+
+    Args:
+        dir_path: Path of the directory.
+
+    Returns:
+        True if the directory is owned by the current user and not writable by its group or others.
+    """
+    try:
+        os.makedirs(dir_path, mode=0o700, exist_ok=True)
+        dir_stat = os.stat(dir_path)
+    except OSError:
+        return False
+
+    getuid = getattr(os, "getuid", None)
+    if getuid is not None and dir_stat.st_uid != getuid():
+        return False
+
+    return stat.S_ISDIR(dir_stat.st_mode) and not dir_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+@contextmanager
+def _swap(obj: Any, attr: str, new: Any) -> Generator[None, None, None]:
+    """Replace an attribute for the duration of the context, much lighter than `unittest.mock.patch`."""
+    old = getattr(obj, attr)
+    setattr(obj, attr, new)
+    try:
+        yield
+    finally:
+        setattr(obj, attr, old)
+
+
 @contextmanager
 def mock_config_file(
     local_values: Optional[Dict] = None,
     unit_test_values: Optional[Dict] = None,
 ) -> Generator[None, None, None]:
-    """Spoof a config file by mocking out the return value of pkg_resources.resource_filename().
+    """Spoof the config files by mocking out the package files looked up by opset's configurator.
 
     To be used as a context manager with the with-as syntax. This function is intended to facilitate unit testing.
 
-    Creates a temporary file and writes some default values to it, and returns said temporary file.
+    The values are served from memory, nothing is written to or parsed from disk.
 
     Args:
-        default_values: Dict object that contains the key-value pairs for all the variables to be put into the fake
-            default.yml file.
         local_values: Dict object that contains the key-value pairs for all the variables to be put into the fake
             local.yml file.
         unit_test_values: Dict object that contains the key-value pairs for all the variables to be put into the fake
             unit_test.yml file.
-
-    Returns:
-        An instance of a TemporaryFile wrapper to be used for replacing the return value of resource_filename. It is
-        not necessary to capture this value with _as_ since the config will already be spoofed.
     """
-
-    def save_as_tmp(_config: Dict[str, Dict[str, Any]], temp_file: _TemporaryFileWrapper) -> str:
-        if not _config:
-            return "this-is-not-a-valid-path.yml"
-        with open(temp_file.name, "w") as file_buffer:
-            yaml.dump(_config, file_buffer)
-        return temp_file.name
-
-    configs = {}
-
-    if local_values:
-        local_temp_file = NamedTemporaryFile()
-        configs["local.yml"] = save_as_tmp(local_values, local_temp_file)
-
-    if unit_test_values:
-        unit_test_temp_file = NamedTemporaryFile()
-        configs["unit_test.yml"] = save_as_tmp(unit_test_values, unit_test_temp_file)
-
-    def mock_resource_filename(_: Any, resource: str) -> Any:
-        return configs.get(resource, "")
-
-    _real_resource_filename = pkg_resources.resource_filename
-
-    try:
-        with patch("pkg_resources.resource_filename", mock_resource_filename):
-            yield
-    finally:
-        pkg_resources.resource_filename = _real_resource_filename
+    from opset import configurator
+
+    in_memory_configs = {
+        f"{_IN_MEMORY_CONFIG_PREFIX}{config_name}": values
+        for config_name, values in (("local.yml", local_values), ("unit_test.yml", unit_test_values))
+        if values
+    }
+    stub = _FakeTraversable({path[len(_IN_MEMORY_CONFIG_PREFIX) :]: path for path in in_memory_configs})
+    real_load_yaml_file = configurator._load_yaml_file
+
+    def mock_files(_: Any) -> Any:
+        return stub
+
+    def mock_load_yaml_file(file_path: str) -> dict:
+        if file_path in in_memory_configs:
+            return cast(dict, configurator._fast_clone(in_memory_configs[file_path]))
+        return real_load_yaml_file(file_path)
+
+    with _swap(configurator, "_resource_files", mock_files), _swap(
+        configurator, "_load_yaml_file", mock_load_yaml_file
+    ):
+        yield
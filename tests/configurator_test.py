@@ -8,15 +8,28 @@ import json
 import logging
 import os
 import warnings
+from unittest.mock import MagicMock
 
 import pytest
 import structlog
-from pydantic import ValidationError
+from pydantic import Field, ValidationError
 from pytest_mock import MockerFixture
 
-from opset.configurator import Config, OpsetConfigAlreadyInitializedError, init_opset_config, load_logging_config
+from opset import OpsetSettingsBaseModel
+from opset.configurator import (
+    Config,
+    HostNameProcessor,
+    OpsetConfigAlreadyInitializedError,
+    _get_level_styles,
+    _load_yaml_file,
+    _read_yaml_file,
+    _search_for_config_file,
+    init_opset_config,
+    load_logging_config,
+)
+from opset.configurator import config as backward_config
 from opset.utils import mock_config_file
-from tests.utils import MockConfig, clear_env_vars, mock_default_config
+from tests.utils import MockAppConfig, MockConfig, clear_env_vars, mock_default_config
 
 TESTING_MODULE = "opset.configurator"
 
@@ -66,6 +79,42 @@ def test_config_env_var_override():
         assert opset_config.config.timeout == 30
 
 
+@clear_env_vars(prefix="OTHER_TOOL")
+def test_config_env_var_override_other_app():
+    os.environ["OTHER_TOOL_TIMEOUT"] = "45"
+
+    with mock_config_file():
+        opset_config = Config("other-tool", MockConfig, "project.config", setup_logging=False)
+        assert opset_config.config.timeout == 45
+
+
+@clear_env_vars
+def test_config_env_var_override_shared_name():
+    class AppConfig(MockAppConfig):
+        timeout: int = 2
+
+    class Cfg(MockConfig):
+        app_timeout: int = 1
+        app: AppConfig
+
+    # Both `app_timeout` and `app.timeout` are overridden by the same env var
+    os.environ["FAKE_TOOL_APP_TIMEOUT"] = "9"
+
+    with mock_config_file():
+        opset_config = Config("fake-tool", Cfg, "project.config", setup_logging=False)
+        assert opset_config.config.app_timeout == 9
+        assert opset_config.config.app.timeout == 9
+
+
+@clear_env_vars
+def test_config_nested_env_var_override():
+    os.environ["FAKE_TOOL_LEVEL1_LEVEL2_LEVEL3_LEVEL4"] = "from env"
+
+    with mock_config_file():
+        opset_config = Config("fake-tool", MockConfig, "project.config", setup_logging=False)
+        assert opset_config.config.level1.level2.level3.level4 == "from env"
+
+
 def test_config_with_logging_config():
     with mock_config_file():
         Config("fake-tool", MockConfig, "project.config", setup_logging=True)
@@ -88,6 +137,32 @@ def test_warn_on_extra_key():
             )
 
 
+@clear_env_vars
+def test_no_warning_on_missing_local_config():
+    with warnings.catch_warnings(record=True) as ws:
+        warnings.simplefilter("always")
+        with mock_config_file():
+            Config("fake-tool", MockConfig, "project.config", setup_logging=False)
+
+    assert not any("Config not found" in str(w.message) for w in ws)
+
+
+@clear_env_vars
+def test_warn_once_on_many_extra_keys():
+    os.environ["FAKE_TOOL_APP_SOME_UNKNOWN_KEY"] = "unknown"
+    os.environ["FAKE_TOOL_APP_OTHER_UNKNOWN_KEY"] = "unknown"
+
+    with warnings.catch_warnings(record=True) as ws:
+        warnings.simplefilter("always")
+        with mock_config_file():
+            Config("fake-tool", MockConfig, "project.config", setup_logging=False)
+
+    warning_messages = [str(w.message) for w in ws if "do not match any possible setting" in str(w.message)]
+    assert len(warning_messages) == 1
+    assert "[FAKE_TOOL_APP_SOME_UNKNOWN_KEY]" in warning_messages[0]
+    assert "[FAKE_TOOL_APP_OTHER_UNKNOWN_KEY]" in warning_messages[0]
+
+
 @clear_env_vars
 def test_raise_on_all_missing_variables():
     class Cfg(MockConfig):
@@ -111,6 +186,17 @@ def test_load_logging_config():
         assert logger.level == logging.INFO
 
 
+def test_load_logging_config_with_colors():
+    with mock_config_file({"logging": {"use_colors": True}}):
+        opset_config = Config("fake-tool", MockConfig, "project.config", setup_logging=False)
+
+    for _ in range(2):
+        logger = load_logging_config(opset_config.config.logging)
+        assert type(logger.handlers[0].formatter.processors[1]) is structlog.dev.ConsoleRenderer
+
+    assert _get_level_styles(True)["debug"] == "\x1b[34m"
+
+
 def test_load_logging_config_with_custom_processor():
     def custom_processor_1(_, __, e):
         return e
@@ -123,6 +209,18 @@ def test_load_logging_config_with_custom_processor():
         assert custom_processor_1 in stream_handler.formatter.foreign_pre_chain
 
 
+def test_load_logging_config_reuses_processors():
+    custom_processors = []
+
+    with mock_config_file():
+        opset_config = Config("fake-tool", MockConfig, "project.config", setup_logging=False)
+        first_chain = load_logging_config(opset_config.config.logging, custom_processors).handlers[0].formatter
+        second_chain = load_logging_config(opset_config.config.logging, custom_processors).handlers[0].formatter
+
+    assert custom_processors == []
+    assert first_chain.foreign_pre_chain == second_chain.foreign_pre_chain
+
+
 def test_load_logging_config_with_custom_handler():
     class CustomHandler(logging.Handler):
         def __init__(self):
@@ -177,8 +275,8 @@ def test_setup_unit_test():
 
 
 def test_json_format() -> None:
-    mock_conf = mock_default_config.copy()
-    mock_conf["logging"]["json_format"] = True
+    # The shared defaults are left untouched, only the logging section is rebuilt
+    mock_conf = {**mock_default_config, "logging": {**mock_default_config["logging"], "json_format": True}}
     with mock_config_file(mock_conf):
         Config("fake-tool", MockConfig, "project.config", setup_logging=True)
         root_logger = logging.getLogger()
@@ -186,13 +284,17 @@ def test_json_format() -> None:
 
 
 @pytest.fixture()
-def mock_retrieve_gcp_secret_value(mocker: MockerFixture):
-    return mocker.patch(f"{TESTING_MODULE}.retrieve_gcp_secret_value")
+def mock_retrieve_gcp_secret_values(mocker: MockerFixture):
+    return mocker.patch(f"{TESTING_MODULE}.retrieve_gcp_secret_values")
+
+
+def _mock_gcp_secret_values(mock_retrieve_gcp_secret_values: MagicMock, value: str) -> None:
+    mock_retrieve_gcp_secret_values.side_effect = lambda secret_strings, config: {s: value for s in secret_strings}
 
 
-def test_gcp_secret_format(mock_retrieve_gcp_secret_value) -> None:
+def test_gcp_secret_format(mock_retrieve_gcp_secret_values) -> None:
     fake_secret_value = "Telesto is fun"
-    mock_retrieve_gcp_secret_value.return_value = fake_secret_value
+    _mock_gcp_secret_values(mock_retrieve_gcp_secret_values, fake_secret_value)
 
     with mock_config_file({"app": {"api_key": "opset+gcp://projects/strickland/secrets/api_key"}}):
         config = Config("fake-tool", MockConfig, "project.config", setup_logging=False).config
@@ -200,9 +302,9 @@ def test_gcp_secret_format(mock_retrieve_gcp_secret_value) -> None:
         assert config.app.api_key == fake_secret_value
 
 
-def test_gcp_secret_format_with_json_value(mock_retrieve_gcp_secret_value) -> None:
+def test_gcp_secret_format_with_json_value(mock_retrieve_gcp_secret_values) -> None:
     fake_secret_value = {"api_key": "dang it bobby", "secret_key": "I sell propane"}
-    mock_retrieve_gcp_secret_value.return_value = json.dumps(fake_secret_value)
+    _mock_gcp_secret_values(mock_retrieve_gcp_secret_values, json.dumps(fake_secret_value))
 
     with mock_config_file({"app": "opset+gcp://projects/strickland/secrets/app"}):
         config = Config("fake-tool", MockConfig, "project.config", setup_logging=False).config
@@ -211,8 +313,22 @@ def test_gcp_secret_format_with_json_value(mock_retrieve_gcp_secret_value) -> No
         assert config.app.api_key == fake_secret_value["api_key"]
 
 
+def test_gcp_secret_format_with_project_mapping(mocker: MockerFixture, mock_retrieve_gcp_secret_values) -> None:
+    opset_config = {"gcp_project_mapping": {"strickland": "strickland-1997"}}
+    mocker.patch(f"{TESTING_MODULE}.init_opset_config", return_value=opset_config)
+    _mock_gcp_secret_values(mock_retrieve_gcp_secret_values, "Telesto is fun")
+    secret_string = "opset+gcp://projects/strickland/secrets/api_key"
+
+    with mock_config_file({"app": {"api_key": secret_string}}):
+        config = Config("fake-tool", MockConfig, "project.config", setup_logging=False).config
+
+        assert config.app.api_key == "Telesto is fun"
+        mock_retrieve_gcp_secret_values.assert_called_once_with([secret_string], opset_config)
+
+
 def test_get_opset_config(mocker: MockerFixture) -> None:
     mocker.patch(f"{TESTING_MODULE}.os.path.exists", return_true=True)
+    mocker.patch(f"{TESTING_MODULE}.os.stat")
     mocker.patch("builtins.open")
     fake_path = "/fake/path"
     mock_yaml = mocker.patch(f"{TESTING_MODULE}.yaml")
@@ -225,6 +341,15 @@ def test_get_opset_config(mocker: MockerFixture) -> None:
     assert opset_config.gcp_project_mapping == {"test": "test-1991"}
 
 
+def test_search_for_config_file(tmp_path) -> None:
+    nested_dir = tmp_path / "project" / "config"
+    nested_dir.mkdir(parents=True)
+    (tmp_path / ".opset.yml").touch()
+
+    assert _search_for_config_file(str(nested_dir)) == str(tmp_path / ".opset.yml")
+    assert _search_for_config_file("/") in (None, "/.opset.yml")
+
+
 def test_backward_config() -> None:
     from opset.configurator import config
 
@@ -232,3 +357,142 @@ def test_backward_config() -> None:
         Config("fake-tool", MockConfig, "project.config", setup_logging=False)
 
         assert config.app.api_key == mock_default_config["app"]["api_key"]
+
+
+def test_load_yaml_file_cache(tmp_path) -> None:
+    yaml_file = tmp_path / "local.yml"
+    yaml_file.write_text("app:\n  api_key: cached\n")
+
+    content = _load_yaml_file(str(yaml_file))
+    content["app"]["api_key"] = "mutated"
+    assert _load_yaml_file(str(yaml_file)) == {"app": {"api_key": "cached"}}
+
+    yaml_file.write_text("app:\n  api_key: updated value\n")
+    assert _load_yaml_file(str(yaml_file)) == {"app": {"api_key": "updated value"}}
+
+
+def test_backward_config_after_setup_unit_test() -> None:
+    from opset.configurator import config
+
+    with mock_config_file():
+        opset_config = Config("fake-tool", MockConfig, "project.config", setup_logging=False)
+        assert config.app.api_key == mock_default_config["app"]["api_key"]
+
+        opset_config.setup_unit_test({"app": {"api_key": "setup unit"}})
+        assert config.app.api_key == "setup unit"
+
+
+def test_load_yaml_file_disk_cache(tmp_path, monkeypatch) -> None:
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("OPSET_YAML_CACHE_DIR", str(cache_dir))
+    yaml_file = tmp_path / "local.yml"
+    yaml_file.write_text("timeout: 10\n")
+
+    assert _read_yaml_file(str(yaml_file), os.stat(yaml_file)) == {"timeout": 10}
+    assert len(list(cache_dir.iterdir())) == 1
+
+    with monkeypatch.context() as m:
+        m.setattr("opset.configurator.yaml.load", None)
+        assert _read_yaml_file(str(yaml_file), os.stat(yaml_file)) == {"timeout": 10}
+
+    yaml_file.write_text("timeout: 300\n")
+    assert _read_yaml_file(str(yaml_file), os.stat(yaml_file)) == {"timeout": 300}
+
+
+def test_load_yaml_file_disk_cache_requires_private_dir(tmp_path, monkeypatch) -> None:
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir(mode=0o777)
+    cache_dir.chmod(0o777)
+    monkeypatch.setenv("OPSET_YAML_CACHE_DIR", str(cache_dir))
+    yaml_file = tmp_path / "local.yml"
+    yaml_file.write_text("timeout: 10\n")
+
+    assert _read_yaml_file(str(yaml_file), os.stat(yaml_file)) == {"timeout": 10}
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_get_config_file_path(tmp_path, monkeypatch) -> None:
+    config_dir = tmp_path / "fake_package" / "config"
+    config_dir.mkdir(parents=True)
+    (tmp_path / "fake_package" / "__init__.py").touch()
+    (config_dir / "local.yml").write_text("timeout: 10\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    opset_config = Config.__new__(Config)
+    opset_config.config_path = "fake_package.config"
+    opset_config._config_file_paths = {}
+
+    assert opset_config._get_config_file_path("local.yml") == str(config_dir / "local.yml")
+    assert opset_config._config_file_paths == {"local.yml": str(config_dir / "local.yml")}
+
+
+def test_merge_configs() -> None:
+    base_config = {"app": {"timeout": 10, "proxy": None, "hosts": "localhost"}, "debug": False}
+    override_config = {"app": {"timeout": 20, "proxy": {"port": 8080}, "hosts": {"primary": "strickland"}}}
+
+    merged_config = Config.__new__(Config)._merge_configs(base_config, override_config)
+
+    assert merged_config is base_config
+    assert merged_config == {
+        "app": {"timeout": 20, "proxy": {"port": 8080}, "hosts": {"primary": "strickland"}},
+        "debug": False,
+    }
+    assert merged_config["app"]["proxy"] is not override_config["app"]["proxy"]
+
+
+@clear_env_vars
+def test_setup_unit_test_leaves_overrides_untouched() -> None:
+    class OptionalSectionConfig(OpsetSettingsBaseModel):
+        flag: bool = False
+        items: list[int] = []
+
+    class Cfg(MockConfig):
+        sub: OptionalSectionConfig | None = None
+
+    config_values = {"sub": {"flag": "yes", "items": "[1,2]"}}
+    with mock_config_file():
+        opset_config = Config("fake-tool", Cfg, "project.config")
+        opset_config.setup_unit_test(config_values)
+
+    assert opset_config.config.sub.flag is True
+    assert opset_config.config.sub.items == [1, 2]
+    assert config_values == {"sub": {"flag": "yes", "items": "[1,2]"}}
+
+
+@clear_env_vars
+def test_mock_config_restores_the_config_exactly() -> None:
+    class Cfg(MockConfig):
+        hidden: str = Field("orig", exclude=True)
+
+    with mock_config_file():
+        opset_config = Config("fake-tool", Cfg, "project.config")
+
+    config = opset_config.config
+    config.hidden = "changed"
+    app_config = config.app
+
+    with opset_config.mock_config({"app": {"api_key": "mocked"}}):
+        assert config.app.api_key == "mocked"
+
+    assert config.hidden == "changed"
+    assert config.app is app_config
+    assert config.app.api_key == mock_default_config["app"]["api_key"]
+
+
+@clear_env_vars
+def test_backward_config_is_a_snapshot() -> None:
+    with mock_config_file():
+        opset_config = Config("fake-tool", MockConfig, "project.config")
+
+    opset_config.config.app.api_key = "edited in place"
+
+    assert backward_config.app.api_key == mock_default_config["app"]["api_key"]
+
+
+def test_hostname_processor(mocker: MockerFixture) -> None:
+    mock_gethostname = mocker.patch(f"{TESTING_MODULE}.socket.gethostname", return_value="strickland-propane")
+
+    processor = HostNameProcessor()
+    assert processor(logging.getLogger(), "info", {})["hostname"] == "strickland-propane"
+    assert processor(logging.getLogger(), "info", {})["hostname"] == "strickland-propane"
+    assert mock_gethostname.call_count == 1
@@ -1,3 +1,4 @@
+from types import SimpleNamespace
 from unittest.mock import MagicMock, call
 
 import pytest
@@ -8,16 +9,26 @@ from opset.gcp_secret_handler import (
     OPSET_GCP_PREFIX,
     GcpError,
     InvalidGcpSecretStringException,
+    MissingGcpSecretManagerLibrary,
     MixedGcpValueTypesError,
     OpsetSecretManagerClient,
     UnsupportedGcpValueTypesError,
+    _access_secret_value,
     retrieve_gcp_secret_value,
+    retrieve_gcp_secret_values,
 )
 
 TESTING_MODULE = "opset.gcp_secret_handler"
 A_SECRET_VALUE = "photo mark suede"
 
 
+@pytest.fixture(autouse=True)
+def clear_secret_values_cache():
+    _access_secret_value.cache_clear()
+    yield
+    _access_secret_value.cache_clear()
+
+
 @pytest.fixture()
 def mock_access_secret_version(mocker: MockerFixture):
     mock_client = mocker.patch(f"{TESTING_MODULE}.OpsetSecretManagerClient")
@@ -27,11 +38,14 @@ def mock_access_secret_version(mocker: MockerFixture):
     return mock_access_secret_version
 
 
-def _mock_gcp_response() -> MagicMock:
-    mock_response = MagicMock()
-    mock_response.payload.data.decode.return_value = A_SECRET_VALUE
+def _mock_gcp_response(value: str = A_SECRET_VALUE) -> SimpleNamespace:
+    """Build a fake `AccessSecretVersionResponse`, only `payload.data.decode()` is ever read from it."""
+    return SimpleNamespace(payload=SimpleNamespace(data=SimpleNamespace(decode=lambda *args, **kwargs: value)))
 
-    return mock_response
+
+def _mock_gcp_responses(mock_access_secret_version: MagicMock, values: dict[str, str]) -> None:
+    """Answer each secret by name, combined secrets are fetched concurrently so the call order is not guaranteed."""
+    mock_access_secret_version.side_effect = lambda request: _mock_gcp_response(values[request.name])
 
 
 def test_retrieve_gcp_secret_value(mock_access_secret_version):
@@ -46,15 +60,97 @@ def test_retrieve_gcp_secret_value(mock_access_secret_version):
     assert gcp_secret_value == A_SECRET_VALUE
 
 
+def test_retrieve_gcp_secret_value_named_versions(mock_access_secret_version):
+    valid_secret_name = f"{OPSET_GCP_PREFIX}projects/versions/secrets/versions"
+    mock_access_secret_version.return_value = _mock_gcp_response()
+
+    retrieve_gcp_secret_value(valid_secret_name)
+
+    mock_access_secret_version.assert_called_with(
+        request=secretmanager.AccessSecretVersionRequest(name="projects/versions/secrets/versions/versions/latest")
+    )
+
+
+def test_retrieve_gcp_secret_value_trailing_separator(mock_access_secret_version):
+    valid_secret_name = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward;"
+    mock_access_secret_version.return_value = _mock_gcp_response()
+
+    assert retrieve_gcp_secret_value(valid_secret_name) == A_SECRET_VALUE
+
+    mock_access_secret_version.assert_called_once_with(
+        request=secretmanager.AccessSecretVersionRequest(name="projects/test-1991/secrets/reward/versions/latest")
+    )
+
+
+def test_retrieve_gcp_secret_value_is_cached(mock_access_secret_version):
+    valid_secret_name = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward"
+    mock_access_secret_version.return_value = _mock_gcp_response()
+
+    assert retrieve_gcp_secret_value(valid_secret_name) == A_SECRET_VALUE
+    assert retrieve_gcp_secret_value(valid_secret_name) == A_SECRET_VALUE
+
+    mock_access_secret_version.assert_called_once()
+
+
+def test_retrieve_gcp_secret_value_disk_cache(mock_access_secret_version, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("OPSET_SECRET_CACHE_DIR", str(cache_dir))
+    versioned_secret_name = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward/versions/3"
+    latest_secret_name = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward"
+    mock_access_secret_version.return_value = _mock_gcp_response()
+
+    assert retrieve_gcp_secret_value(versioned_secret_name) == A_SECRET_VALUE
+    assert retrieve_gcp_secret_value(latest_secret_name) == A_SECRET_VALUE
+    # Only the numbered version is written to disk
+    assert len(list(cache_dir.iterdir())) == 1
+
+    _access_secret_value.cache_clear()
+    mock_access_secret_version.reset_mock()
+
+    assert retrieve_gcp_secret_value(versioned_secret_name) == A_SECRET_VALUE
+    mock_access_secret_version.assert_not_called()
+
+
+def test_retrieve_gcp_secret_value_disk_cache_requires_private_dir(mock_access_secret_version, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    cache_dir.chmod(0o777)
+    monkeypatch.setenv("OPSET_SECRET_CACHE_DIR", str(cache_dir))
+    versioned_secret_name = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward/versions/3"
+    mock_access_secret_version.return_value = _mock_gcp_response()
+
+    assert retrieve_gcp_secret_value(versioned_secret_name) == A_SECRET_VALUE
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_retrieve_gcp_secret_values(mock_access_secret_version):
+    reward_secret = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward"
+    combined_secret = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward;projects/test-2024/secrets/prize"
+
+    _mock_gcp_responses(
+        mock_access_secret_version,
+        {
+            "projects/test-1991/secrets/reward/versions/latest": "[1,2]",
+            "projects/test-2024/secrets/prize/versions/latest": "[3]",
+        },
+    )
+
+    gcp_secret_values = retrieve_gcp_secret_values([reward_secret, combined_secret, reward_secret])
+
+    assert gcp_secret_values == {reward_secret: "[1,2]", combined_secret: "[1, 2, 3]"}
+    assert mock_access_secret_version.call_count == 2
+
+
 def test_retrieve_gcp_secret_value_combined_secrets_list(mock_access_secret_version):
     valid_secret_name = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward;projects/test-2024/secrets/prize"
 
-    secret_val_1 = MagicMock()
-    secret_val_1.payload.data.decode.return_value = "[1,2,3,4]"
-    secret_val_2 = MagicMock()
-    secret_val_2.payload.data.decode.return_value = "[4,5,6]"
-
-    mock_access_secret_version.side_effect = [secret_val_1, secret_val_2]
+    _mock_gcp_responses(
+        mock_access_secret_version,
+        {
+            "projects/test-1991/secrets/reward/versions/latest": "[1,2,3,4]",
+            "projects/test-2024/secrets/prize/versions/latest": "[4,5,6]",
+        },
+    )
 
     gcp_secret_value = retrieve_gcp_secret_value(valid_secret_name)
 
@@ -70,7 +166,8 @@ def test_retrieve_gcp_secret_value_combined_secrets_list(mock_access_secret_vers
                     name="projects/test-2024/secrets/prize/versions/latest"
                 )
             ),
-        ]
+        ],
+        any_order=True,
     )
     assert gcp_secret_value == "[1, 2, 3, 4, 4, 5, 6]"
 
@@ -78,12 +175,13 @@ def test_retrieve_gcp_secret_value_combined_secrets_list(mock_access_secret_vers
 def test_retrieve_gcp_secret_value_combined_secrets_dict(mock_access_secret_version):
     valid_secret_name = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward;projects/test-2024/secrets/prize"
 
-    secret_val_1 = MagicMock()
-    secret_val_1.payload.data.decode.return_value = '{"client1":{"host":"localhost"}}'
-    secret_val_2 = MagicMock()
-    secret_val_2.payload.data.decode.return_value = '{"client2":{"host":"not-localhost"}}'
-
-    mock_access_secret_version.side_effect = [secret_val_1, secret_val_2]
+    _mock_gcp_responses(
+        mock_access_secret_version,
+        {
+            "projects/test-1991/secrets/reward/versions/latest": '{"client1":{"host":"localhost"}}',
+            "projects/test-2024/secrets/prize/versions/latest": '{"client2":{"host":"not-localhost"}}',
+        },
+    )
 
     gcp_secret_value = retrieve_gcp_secret_value(valid_secret_name)
 
@@ -99,7 +197,8 @@ def test_retrieve_gcp_secret_value_combined_secrets_dict(mock_access_secret_vers
                     name="projects/test-2024/secrets/prize/versions/latest"
                 )
             ),
-        ]
+        ],
+        any_order=True,
     )
     assert gcp_secret_value == '{"client1": {"host": "localhost"}, "client2": {"host": "not-localhost"}}'
 
@@ -107,12 +206,13 @@ def test_retrieve_gcp_secret_value_combined_secrets_dict(mock_access_secret_vers
 def test_retrieve_gcp_secret_value_combined_secrets_mixed_types(mock_access_secret_version):
     valid_secret_name = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward;projects/test-2024/secrets/prize"
 
-    secret_val_1 = MagicMock()
-    secret_val_1.payload.data.decode.return_value = '{"client1":{"host":"localhost"}}'
-    secret_val_2 = MagicMock()
-    secret_val_2.payload.data.decode.return_value = "[1,2,3]"
-
-    mock_access_secret_version.side_effect = [secret_val_1, secret_val_2]
+    _mock_gcp_responses(
+        mock_access_secret_version,
+        {
+            "projects/test-1991/secrets/reward/versions/latest": '{"client1":{"host":"localhost"}}',
+            "projects/test-2024/secrets/prize/versions/latest": "[1,2,3]",
+        },
+    )
 
     with pytest.raises(MixedGcpValueTypesError):
         retrieve_gcp_secret_value(valid_secret_name)
@@ -121,12 +221,13 @@ def test_retrieve_gcp_secret_value_combined_secrets_mixed_types(mock_access_secr
 def test_retrieve_gcp_secret_value_combined_secrets_unsupported_types(mock_access_secret_version):
     valid_secret_name = f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward;projects/test-2024/secrets/prize"
 
-    secret_val_1 = MagicMock()
-    secret_val_1.payload.data.decode.return_value = "a string"
-    secret_val_2 = MagicMock()
-    secret_val_2.payload.data.decode.return_value = "another string"
-
-    mock_access_secret_version.side_effect = [secret_val_1, secret_val_2]
+    _mock_gcp_responses(
+        mock_access_secret_version,
+        {
+            "projects/test-1991/secrets/reward/versions/latest": "a string",
+            "projects/test-2024/secrets/prize/versions/latest": "another string",
+        },
+    )
 
     with pytest.raises(UnsupportedGcpValueTypesError):
         retrieve_gcp_secret_value(valid_secret_name)
@@ -161,12 +262,13 @@ def test_retrieve_gcp_secret_value_with_mapping_many_secrets(mock_access_secret_
     valid_secret_name = f"{OPSET_GCP_PREFIX}projects/test/secrets/reward/versions/2;projects/test-2024/secrets/prize"
     fake_config = {"gcp_project_mapping": {"test": "test-1991"}}
 
-    secret_val_1 = MagicMock()
-    secret_val_1.payload.data.decode.return_value = "[1]"
-    secret_val_2 = MagicMock()
-    secret_val_2.payload.data.decode.return_value = "[2]"
-
-    mock_access_secret_version.side_effect = [secret_val_1, secret_val_2]
+    _mock_gcp_responses(
+        mock_access_secret_version,
+        {
+            "projects/test-1991/secrets/reward/versions/2": "[1]",
+            "projects/test-2024/secrets/prize/versions/latest": "[2]",
+        },
+    )
 
     retrieve_gcp_secret_value(valid_secret_name, config=fake_config)
 
@@ -178,7 +280,8 @@ def test_retrieve_gcp_secret_value_with_mapping_many_secrets(mock_access_secret_
                     name="projects/test-2024/secrets/prize/versions/latest"
                 )
             ),
-        ]
+        ],
+        any_order=True,
     )
 
 
@@ -202,6 +305,9 @@ def test_retrieve_gcp_secret_value_raise(mock_access_secret_version):
         f"{OPSET_GCP_PREFIX}test-1991/secrets/reward",
         f"{OPSET_GCP_PREFIX}",
         f"{OPSET_GCP_PREFIX}reward",
+        f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward/revisions/2",
+        f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/rewardprojects/test-2024/secrets/prize",
+        f"{OPSET_GCP_PREFIX}projects/test-1991/secrets/reward;;projects/test-2024/secrets/prize",
         "bad+prefix://projects/test-1991/secrets/reward",
     ],
 )
@@ -222,3 +328,11 @@ def test_opset_secret_manager_client(mocker: MockerFixture):
 
     assert mock_client.call_count == 1
     assert instance == mock_client.return_value
+
+
+def test_opset_secret_manager_client_without_library(mocker: MockerFixture):
+    mocker.patch.object(OpsetSecretManagerClient, "instance", None)
+    mocker.patch(f"{TESTING_MODULE}._load_secretmanager", return_value=None)
+
+    with pytest.raises(MissingGcpSecretManagerLibrary):
+        OpsetSecretManagerClient.get_or_create()
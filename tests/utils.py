@@ -16,24 +16,32 @@ def remove_env_vars(app_name: str):
     Args:
         app_name: The name of the application, needed in order to select only the relevant variables in ENV
     """
-    for key in os.environ.keys():
-        if key.startswith(app_name):
-            del os.environ[key]
+    # The matching keys are collected first, os.environ can't be modified while it is being iterated on
+    for key in [key for key in os.environ if key.startswith(app_name)]:
+        del os.environ[key]
 
 
-def clear_env_vars(fn):
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        remove_env_vars("FAKE_TOOL")
+def clear_env_vars(fn=None, *, prefix: str = "FAKE_TOOL"):
+    """Remove the environment variables starting with `prefix` before and after the decorated test.
 
-        try:
-            result = fn(*args, **kwargs)
-        finally:
-            remove_env_vars("FAKE_TOOL")
+    Can be used as `@clear_env_vars` or `@clear_env_vars(prefix="OTHER_TOOL")`.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            remove_env_vars(prefix)
+
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                remove_env_vars(prefix)
+
+            return result
 
-        return result
+        return wrapper
 
-    return wrapper
+    return decorator(fn) if fn is not None else decorator
 
 
 class MockAppConfig(OpsetSettingsBaseModel):
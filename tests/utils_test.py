@@ -1,6 +1,9 @@
 # utils_test.py
 # Alexandre Jutras, 2019-06-26
 # Copyright (c) Element AI Inc. All rights not expressly granted hereunder are reserved.
+import importlib.resources
+import math
+
 import pytest
 
 from opset import Config
@@ -27,6 +30,12 @@ def test_mock_config():
     assert config.app.api_key == mock_default_config["app"]["api_key"]
 
 
+def test_mock_config_file_only_stubs_opset_lookups():
+    with mock_config_file(local_values={"app": {"api_key": "from local"}}):
+        # Packages looked up outside of opset still resolve to their real files
+        assert (importlib.resources.files("json") / "__init__.py").is_file()
+
+
 @pytest.mark.parametrize(
     "test, expected",
     (
@@ -54,6 +63,14 @@ def test_convert_type(test, expected):
     assert convert_type(test) == expected
 
 
+def test_convert_type_json_edge_cases():
+    # Decoded the same way whatever optional packages are installed
+    assert convert_type("[123456789012345678901234567890]") == [123456789012345678901234567890]
+    assert math.isnan(convert_type("[NaN]")[0])
+    assert convert_type("[1e400]") == [math.inf]
+    assert convert_type('{"a": Infinity}') == {"a": math.inf}
+
+
 @pytest.mark.parametrize("test", ('["test"', "HELLO", "nope", "test2000", '{"test"}'))
 def test_convert_type_fallback(test):
     assert convert_type(test) == test